@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+知識庫集合的垃圾回收與壓縮模組
+"""
+
+import chromadb
+import os
+import sqlite3
+from typing import List, Dict, Any
+from improved_deduplication import iter_collection_pages, load_indexed_hashes, write_indexed_hashes
+
+class CollectionGarbageCollector:
+    """清理集合中失效區塊並同步雜湊狀態"""
+
+    def __init__(self, db_path: str = "./chroma_db", collection_name: str = "knowledge_base"):
+        self.db_path = db_path
+        self.client = chromadb.PersistentClient(path=db_path)
+        self.collection = self.client.get_collection(name=collection_name)
+
+    def get_disk_usage(self) -> int:
+        """
+        計算資料庫目錄佔用的位元組數
+
+        Returns:
+            資料庫目錄大小 (bytes)
+        """
+        total = 0
+        for root, _, files in os.walk(self.db_path):
+            for file_name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return total
+
+    def find_garbage(self, page_size: int = 1000, dedupe: bool = False) -> Dict[str, Any]:
+        """
+        分頁掃描集合，找出需要刪除的區塊
+
+        來源文件已不存在 (file_path 不存在) 的區塊一律視為失效；
+        指定 dedupe 時，與較早區塊內容雜湊重複的區塊也會被列入。
+
+        Args:
+            page_size: 每次從 ChromaDB 讀取的筆數
+            dedupe: 是否列入內容雜湊重複的區塊
+
+        Returns:
+            包含待刪除 ID 與保留下來的內容雜湊的字典
+        """
+        missing_file_ids = []
+        duplicate_ids = []
+        live_hashes = set()
+        scanned = 0
+        # 同一個檔案的多個區塊只需檢查一次檔案是否存在
+        path_exists = {}
+
+        for page in iter_collection_pages(self.collection, include=['metadatas'], page_size=page_size):
+            for doc_id, metadata in zip(page['ids'], page['metadatas']):
+                metadata = metadata or {}
+                scanned += 1
+
+                file_path = metadata.get("file_path")
+                if file_path:
+                    if file_path not in path_exists:
+                        path_exists[file_path] = os.path.exists(file_path)
+                    if not path_exists[file_path]:
+                        missing_file_ids.append(doc_id)
+                        continue
+
+                content_hash = metadata.get("content_hash")
+                if content_hash:
+                    if dedupe and content_hash in live_hashes:
+                        duplicate_ids.append(doc_id)
+                        continue
+                    live_hashes.add(content_hash)
+
+        return {
+            "scanned": scanned,
+            "missing_file_ids": missing_file_ids,
+            "duplicate_ids": duplicate_ids,
+            "live_hashes": live_hashes
+        }
+
+    def delete_ids(self, ids: List[str], batch_size: int = 1000) -> int:
+        """
+        分批刪除指定 ID 的區塊
+
+        Args:
+            ids: 要刪除的區塊 ID
+            batch_size: 每次刪除的筆數
+
+        Returns:
+            刪除的筆數
+        """
+        for start in range(0, len(ids), batch_size):
+            self.collection.delete(ids=ids[start:start + batch_size])
+        return len(ids)
+
+    def vacuum(self) -> bool:
+        """
+        對 ChromaDB 的 SQLite 檔案執行 VACUUM 以釋放磁碟空間
+
+        Returns:
+            如果成功執行則返回 True，否則返回 False
+        """
+        sqlite_path = os.path.join(self.db_path, "chroma.sqlite3")
+        if not os.path.exists(sqlite_path):
+            return False
+        try:
+            conn = sqlite3.connect(sqlite_path)
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+            return True
+        except sqlite3.Error as e:
+            print(f"執行 VACUUM 時出錯: {e}")
+            return False
+
+    def collect(self,
+                indexed_hashes_file: str = "./indexed_hashes.txt",
+                page_size: int = 1000,
+                dry_run: bool = False,
+                vacuum: bool = True,
+                dedupe: bool = False,
+                force: bool = False,
+                max_missing_ratio: float = 0.5) -> Dict[str, Any]:
+        """
+        刪除失效區塊、重寫雜湊檔案並壓縮資料庫
+
+        被刪除區塊的雜湊會從雜湊檔案中移除，之後重新索引時其他仍存在的
+        相同內容文件才不會被誤判為已索引而跳過。
+
+        Args:
+            indexed_hashes_file: 已索引雜湊檔案路徑
+            page_size: 分頁讀取/刪除的筆數
+            dry_run: 只回報結果而不實際刪除
+            vacuum: 刪除後是否壓縮 SQLite 檔案
+            dedupe: 是否同時刪除內容雜湊重複的區塊
+            force: 來源文件缺失比例過高時仍執行刪除
+            max_missing_ratio: 未指定 force 時允許的來源文件缺失比例上限
+
+        Returns:
+            清理報告
+        """
+        disk_before = self.get_disk_usage()
+        garbage = self.find_garbage(page_size=page_size, dedupe=dedupe)
+        live_hashes = garbage["live_hashes"]
+
+        # 雜湊檔案只保留集合中仍存在的雜湊，並補上缺少的項目
+        file_hashes = load_indexed_hashes(indexed_hashes_file)
+        kept_hashes = [h for h in file_hashes if h in live_hashes]
+        kept_set = set(kept_hashes)
+        new_hashes = kept_hashes + sorted(live_hashes - kept_set)
+
+        report = {
+            "scanned": garbage["scanned"],
+            "missing_file_chunks": len(garbage["missing_file_ids"]),
+            "duplicate_chunks": len(garbage["duplicate_ids"]),
+            "deleted_chunks": 0,
+            "hashes_before": len(file_hashes),
+            "hashes_after": len(new_hashes),
+            "disk_before": disk_before,
+            "disk_after": disk_before,
+            "dry_run": dry_run
+        }
+        if dry_run:
+            return report
+
+        # file_path 可能是相對路徑，在其他目錄執行或共享目錄未掛載時
+        # 會讓大部分區塊看起來都失效，此時拒絕刪除
+        if garbage["scanned"] and not force:
+            missing_ratio = report["missing_file_chunks"] / garbage["scanned"]
+            if missing_ratio > max_missing_ratio:
+                raise ValueError(f"{report['missing_file_chunks']}/{garbage['scanned']} 個區塊的來源文件不存在，"
+                                 f"請確認執行目錄或使用 --force 強制刪除")
+
+        report["deleted_chunks"] = self.delete_ids(
+            garbage["missing_file_ids"] + garbage["duplicate_ids"], batch_size=page_size
+        )
+        write_indexed_hashes(new_hashes, indexed_hashes_file)
+
+        if vacuum and report["deleted_chunks"] > 0:
+            self.vacuum()
+        report["disk_after"] = self.get_disk_usage()
+
+        return report
@@ -30,6 +30,18 @@ class FlexiblePreprocessor:
                 r'accelerometer', r'gyroscope', r'magnetometer'
             ]
         }
+        
+        # 同義詞組（用於查詢擴展），每組中的詞彙互為同義詞
+        self.term_synonyms = [
+            ['陀螺儀', 'gyroscope'],
+            ['加速度計', 'accelerometer'],
+            ['磁力計', 'magnetometer'],
+            ['推薦', 'recommend'],
+            ['建議', 'suggested'],
+            ['警告', 'warning'],
+            ['注意', 'caution'],
+            ['避免', 'do not']
+        ]
     
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         """
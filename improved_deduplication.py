@@ -5,7 +5,8 @@
 
 import chromadb
 import hashlib
-from typing import List, Dict, Any, Optional
+import os
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 
 class ImprovedDeduplication:
     """改進的重複檢測和處理類"""
@@ -114,6 +115,69 @@ class ImprovedDeduplication:
             print(f"獲取文檔數量時出錯: {e}")
             return 0
 
+def load_indexed_hashes(indexed_hashes_file: str = "./indexed_hashes.txt") -> List[str]:
+    """
+    讀取已索引的內容雜湊（保留檔案中的順序並去重）
+    
+    Args:
+        indexed_hashes_file: 雜湊檔案路徑
+        
+    Returns:
+        雜湊值列表
+    """
+    hashes = []
+    seen = set()
+    if os.path.exists(indexed_hashes_file):
+        with open(indexed_hashes_file, "r") as f:
+            for line in f:
+                hash_val = line.strip()
+                if hash_val and hash_val not in seen:
+                    seen.add(hash_val)
+                    hashes.append(hash_val)
+    return hashes
+
+def write_indexed_hashes(hashes: Iterable[str], indexed_hashes_file: str = "./indexed_hashes.txt") -> int:
+    """
+    以原子方式重寫已索引的內容雜湊檔案
+    
+    Args:
+        hashes: 要寫入的雜湊值
+        indexed_hashes_file: 雜湊檔案路徑
+        
+    Returns:
+        寫入的雜湊數量
+    """
+    count = 0
+    tmp_file = indexed_hashes_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        for hash_val in hashes:
+            f.write(hash_val + "\n")
+            count += 1
+    os.replace(tmp_file, indexed_hashes_file)
+    return count
+
+def iter_collection_pages(collection, include: List[str], page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    分頁讀取集合內容，避免一次將整個集合載入記憶體
+    
+    Args:
+        collection: ChromaDB 集合
+        include: 要包含的欄位 (如 'documents', 'metadatas', 'embeddings')
+        page_size: 每頁筆數
+        
+    Yields:
+        每一頁的 collection.get 結果
+    """
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+        yield page
+        offset += len(page['ids'])
+        if len(page['ids']) < page_size:
+            break
+
 def test_deduplication():
     """
     測試重複檢測功能
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+批次多查詢搜尋模組
+
+將單一查詢依實體詞彙擴展為多個變體（硬體型號寫法、中英同義詞），
+所有變體以一次 embed 呼叫向量化，並以一次 collection.query 查詢，
+再用 NumPy 進行分數融合與 MMR 去除近似重複的結果。
+"""
+
+import typer
+import chromadb
+import numpy as np
+import re
+import json
+from ollama import Client
+from typing import List, Dict, Any, Optional
+from flexible_preprocessing import FlexiblePreprocessor
+
+app = typer.Typer()
+
+def model_variants(model: str) -> List[str]:
+    """
+    產生硬體型號的常見寫法 (如 MPU-9250 <-> MPU9250)
+    """
+    variants = []
+    if '-' in model:
+        variants.append(model.replace('-', ''))
+    else:
+        match = re.match(r'^([A-Z]+)(\d[A-Z0-9]*)$', model)
+        if match:
+            variants.append(f"{match.group(1)}-{match.group(2)}")
+    return variants
+
+def _is_model_name(token: str) -> bool:
+    """
+    判斷是否為硬體型號：至少兩個大寫字母與兩個數字 (如 GY-91, MPU-9250, ICM20948)
+    """
+    return len(re.findall(r'[A-Z]', token)) >= 2 and len(re.findall(r'\d', token)) >= 2
+
+def _extract_models(query: str, preprocessor: FlexiblePreprocessor) -> List[str]:
+    """
+    以區分大小寫的方式從查詢中提取硬體型號，避免 i2c、python3 等一般詞彙被誤判
+    """
+    models = []
+    for pattern in preprocessor.entity_patterns["hardware_models"]:
+        for model in re.findall(pattern, query):
+            if _is_model_name(model) and model not in models:
+                models.append(model)
+    return models
+
+def _token_pattern(token: str):
+    """
+    建立完整比對型號的模式，避免 MPU-9250 改寫到 MPU-92500
+    """
+    return re.compile(rf'(?<![A-Za-z0-9-]){re.escape(token)}(?![A-Za-z0-9-])')
+
+def _term_pattern(term: str):
+    """
+    建立詞彙的比對模式：英文詞彙需完整比對單字，中文詞彙以子字串比對
+    """
+    escaped = re.escape(term)
+    if term.isascii():
+        escaped = rf'\b{escaped}\b'
+    return re.compile(escaped, re.IGNORECASE)
+
+def expand_query(query: str, preprocessor: FlexiblePreprocessor,
+                 max_expansions: int = 4, max_model_variants: int = 2) -> List[str]:
+    """
+    依提取的實體詞彙擴展查詢
+
+    Args:
+        query: 原始查詢
+        preprocessor: 提供實體模式與同義詞的預處理器
+        max_expansions: 最多增加的變體數量
+        max_model_variants: 其中硬體型號寫法變體的數量上限
+
+    Returns:
+        查詢列表，第一個為原始查詢
+    """
+    # 硬體型號的不同寫法
+    model_queries = []
+    for model in sorted(_extract_models(query, preprocessor), key=len, reverse=True):
+        pattern = _token_pattern(model)
+        if not pattern.search(query):
+            continue
+        for variant in model_variants(model):
+            model_queries.append(pattern.sub(lambda _: variant, query))
+    model_queries = list(dict.fromkeys(model_queries))[:max_model_variants]
+
+    # 中英同義詞替換
+    synonym_queries = []
+    for group in preprocessor.term_synonyms:
+        for term in group:
+            pattern = _term_pattern(term)
+            if not pattern.search(query):
+                continue
+            for synonym in group:
+                if synonym != term:
+                    synonym_queries.append(pattern.sub(lambda _: synonym, query))
+
+    # 兩類變體交錯排列，避免其中一類佔滿 max_expansions
+    queries = [query]
+    for index in range(max(len(model_queries), len(synonym_queries))):
+        queries.extend(q[index] for q in (model_queries, synonym_queries) if index < len(q))
+
+    # 去重並保留順序
+    unique_queries = list(dict.fromkeys(queries))
+    return unique_queries[:max_expansions + 1]
+
+def fuse_scores(ids: List[List[str]], query_weights: np.ndarray, rrf_k: int = 60):
+    """
+    以加權 Reciprocal Rank Fusion 合併多個查詢的結果
+
+    Args:
+        ids: 每個查詢回傳的 ID 列表
+        query_weights: 每個查詢的權重
+        rrf_k: RRF 平滑常數
+
+    Returns:
+        (唯一 ID 陣列, 每個唯一 ID 在扁平結果中的第一個位置, 融合分數, 命中的查詢數)
+    """
+    lengths = np.array([len(row) for row in ids])
+    flat_ids = np.array([doc_id for row in ids for doc_id in row])
+    ranks = np.concatenate([np.arange(n) for n in lengths])
+    weights = np.repeat(query_weights, lengths)
+
+    unique_ids, first_index, inverse = np.unique(flat_ids, return_index=True, return_inverse=True)
+    scores = np.zeros(len(unique_ids))
+    np.add.at(scores, inverse, weights / (rrf_k + ranks + 1))
+    hits = np.bincount(inverse, minlength=len(unique_ids))
+    return unique_ids, first_index, scores, hits
+
+def mmr_select(embeddings: np.ndarray, relevance: np.ndarray, top_k: int,
+               lambda_mult: float = 0.7, duplicate_threshold: float = 0.95) -> List[int]:
+    """
+    以 MMR 選出相關且彼此不重複的結果
+
+    Args:
+        embeddings: 候選結果的向量
+        relevance: 候選結果的相關分數
+        top_k: 要選出的數量
+        lambda_mult: 相關性與多樣性的權衡 (1.0 為只看相關性)
+        duplicate_threshold: 與已選結果的餘弦相似度達到此值即視為重複並排除
+
+    Returns:
+        選出的候選索引（依選擇順序）
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.where(norms == 0, 1, norms)
+    span = relevance.max() - relevance.min()
+    rel = (relevance - relevance.min()) / span if span > 0 else np.ones_like(relevance)
+
+    selected = []
+    available = np.ones(len(rel), dtype=bool)
+    max_sim = np.zeros(len(rel))
+    while len(selected) < top_k and available.any():
+        mmr = lambda_mult * rel - (1 - lambda_mult) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+
+        # 更新每個候選與已選結果的最大相似度
+        max_sim = np.maximum(max_sim, unit @ unit[best])
+        available &= max_sim < duplicate_threshold
+    return selected
+
+class MultiQuerySearch:
+    """擴展查詢並在一次往返中完成搜尋"""
+
+    def __init__(self,
+                 db_path: str = "./chroma_db",
+                 collection_name: str = "knowledge_base",
+                 ollama_base_url: str = "http://192.168.88.99:11434",
+                 embedding_model: str = "bge-m3-gpu:latest"):
+        self.preprocessor = FlexiblePreprocessor()
+        self.embedding_model = embedding_model
+        self.ollama_client = Client(host=ollama_base_url)
+        self.client = chromadb.PersistentClient(path=db_path)
+        self.collection = self.client.get_collection(name=collection_name)
+
+    def expand_query(self, query: str, max_expansions: int = 4) -> List[str]:
+        """
+        依提取的實體詞彙擴展查詢
+        """
+        return expand_query(query, self.preprocessor, max_expansions=max_expansions)
+
+    def search(self,
+               query: str,
+               n_results: int = 5,
+               max_expansions: int = 4,
+               expansion_weight: float = 0.7,
+               lambda_mult: float = 0.7,
+               metadata_filter: Optional[Dict[str, Any]] = None,
+               queries: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        擴展查詢後以一次 embed 與一次 query 完成搜尋
+
+        Args:
+            query: 原始查詢
+            n_results: 回傳結果數量
+            max_expansions: 最多增加的查詢變體數量
+            expansion_weight: 擴展查詢相對於原始查詢的權重
+            lambda_mult: MMR 的相關性權重
+            metadata_filter: ChromaDB where 條件
+            queries: 已擴展的查詢列表（第一個須為原始查詢），未提供時自動擴展
+
+        Returns:
+            搜尋結果列表
+        """
+        if queries is None:
+            queries = self.expand_query(query, max_expansions=max_expansions)
+
+        # 所有變體一次向量化
+        response = self.ollama_client.embed(model=self.embedding_model, input=queries)
+        query_embeddings = response['embeddings']
+
+        # 多取一些候選供融合與 MMR 使用
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results * 3,
+            where=metadata_filter,
+            include=['documents', 'metadatas', 'embeddings']
+        )
+        if not any(results['ids']):
+            return []
+
+        query_weights = np.array([1.0] + [expansion_weight] * (len(queries) - 1))
+        unique_ids, first_index, scores, hits = fuse_scores(results['ids'], query_weights)
+
+        flat_documents = [doc for row in results['documents'] for doc in row]
+        flat_metadatas = [meta for row in results['metadatas'] for meta in row]
+        flat_embeddings = np.concatenate(
+            [np.asarray(row, dtype=np.float32) for row in results['embeddings'] if len(row) > 0]
+        )
+
+        candidate_embeddings = flat_embeddings[first_index]
+        selected = mmr_select(candidate_embeddings, scores, n_results, lambda_mult=lambda_mult)
+
+        return [
+            {
+                "id": str(unique_ids[i]),
+                "document": flat_documents[first_index[i]],
+                "metadata": flat_metadatas[first_index[i]],
+                "score": float(scores[i]),
+                "matched_queries": int(hits[i])
+            }
+            for i in selected
+        ]
+
+@app.command()
+def search(query: str,
+           n_results: int = 5,
+           max_expansions: int = 4,
+           metadata_filter: Optional[str] = None):
+    """
+    擴展查詢並搜尋知識庫
+    """
+    try:
+        searcher = MultiQuerySearch()
+    except Exception as e:
+        typer.echo(f"找不到知識庫集合: {e}")
+        raise typer.Exit(code=1)
+    where = json.loads(metadata_filter) if metadata_filter else None
+
+    queries = searcher.expand_query(query, max_expansions=max_expansions)
+    typer.echo(f"查詢變體: {queries}")
+    results = searcher.search(query, n_results=n_results, metadata_filter=where, queries=queries)
+
+    for rank, result in enumerate(results, 1):
+        metadata = result["metadata"] or {}
+        typer.echo(f"{rank}. {metadata.get('file_path', result['id'])} "
+                   f"(分數: {result['score']:.4f}, 命中查詢數: {result['matched_queries']})")
+        typer.echo(f"   {result['document'][:200]}")
+
+if __name__ == "__main__":
+    app()
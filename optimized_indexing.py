@@ -16,8 +16,11 @@ from pygments.util import ClassNotFound
 import magic
 from flexible_preprocessing import FlexiblePreprocessor
 from improved_deduplication import ImprovedDeduplication
+from snapshot_manager import app as snapshot_app
+from collection_gc import CollectionGarbageCollector
 
 app = typer.Typer()
+app.add_typer(snapshot_app, name="snapshot", help="知識庫快照匯出/匯入")
 
 class OptimizedIndexer:
     """優化的索引器"""
@@ -217,5 +220,43 @@ def index(path: str):
     indexer = OptimizedIndexer()
     indexer.index(path)
 
+@app.command()
+def gc(db_path: str = "./chroma_db",
+       collection_name: str = "knowledge_base",
+       indexed_hashes_file: str = "./indexed_hashes.txt",
+       dry_run: bool = False,
+       vacuum: bool = True,
+       dedupe: bool = False,
+       force: bool = False,
+       page_size: int = 1000):
+    """
+    清理失效區塊並壓縮知識庫
+    """
+    try:
+        collector = CollectionGarbageCollector(db_path=db_path, collection_name=collection_name)
+    except Exception as e:
+        typer.echo(f"找不到集合 {collection_name} ({db_path}): {e}")
+        raise typer.Exit(code=1)
+    
+    try:
+        report = collector.collect(indexed_hashes_file=indexed_hashes_file, page_size=page_size,
+                                   dry_run=dry_run, vacuum=vacuum, dedupe=dedupe, force=force)
+    except ValueError as e:
+        typer.echo(f"清理中止: {e}")
+        raise typer.Exit(code=1)
+    
+    typer.echo(f"掃描了 {report['scanned']} 個區塊")
+    typer.echo(f"  來源文件不存在: {report['missing_file_chunks']} 個")
+    if dedupe:
+        typer.echo(f"  重複內容雜湊: {report['duplicate_chunks']} 個")
+    if report["dry_run"]:
+        typer.echo("試運行模式，未刪除任何區塊")
+        return
+    typer.echo(f"已刪除 {report['deleted_chunks']} 個區塊")
+    typer.echo(f"雜湊檔案: {report['hashes_before']} -> {report['hashes_after']} 個")
+    reclaimed = report["disk_before"] - report["disk_after"]
+    typer.echo(f"磁碟用量: {report['disk_before'] / 1024 / 1024:.2f} MB -> "
+               f"{report['disk_after'] / 1024 / 1024:.2f} MB (釋放 {reclaimed / 1024 / 1024:.2f} MB)")
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
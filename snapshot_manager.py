@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+知識庫快照匯出/匯入模組
+
+快照為一個目錄，包含：
+  - manifest.json   : 快照資訊（集合名稱、筆數、向量維度等）
+  - chunks.jsonl    : 每行一個區塊 (id, document, metadata)
+  - embeddings.npy  : float32 向量矩陣，列順序與 chunks.jsonl 相同
+
+匯出與匯入皆以分頁/分批方式進行，記憶體用量與集合大小無關；
+匯入時直接寫入已存的向量，不需呼叫 Ollama 重新向量化。
+"""
+
+import typer
+import chromadb
+import numpy as np
+import os
+import json
+from itertools import islice
+from typing import Dict, Any
+from improved_deduplication import iter_collection_pages, write_indexed_hashes
+
+app = typer.Typer()
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.jsonl"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+class SnapshotManager:
+    """快照匯出/匯入管理器"""
+
+    def __init__(self, db_path: str = "./chroma_db", collection_name: str = "knowledge_base"):
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.client = chromadb.PersistentClient(path=db_path)
+
+    def export_snapshot(self, output_dir: str, page_size: int = 1000,
+                        embedding_model: str = "bge-m3-gpu:latest") -> Dict[str, Any]:
+        """
+        將集合的區塊、元數據、內容雜湊及向量匯出為快照
+
+        Args:
+            output_dir: 快照輸出目錄
+            page_size: 每次從 ChromaDB 讀取的筆數
+            embedding_model: 產生向量所用的模型名稱（記錄於 manifest）
+
+        Returns:
+            快照的 manifest
+        """
+        collection = self.client.get_collection(name=self.collection_name)
+        total = collection.count()
+        os.makedirs(output_dir, exist_ok=True)
+
+        chunks_path = os.path.join(output_dir, CHUNKS_FILE)
+        embeddings_path = os.path.join(output_dir, EMBEDDINGS_FILE)
+
+        embeddings_out = None
+        dimension = 0
+        written = 0
+        with open(chunks_path, "w", encoding="utf-8") as chunks_file:
+            for page in iter_collection_pages(collection,
+                                              include=['documents', 'metadatas', 'embeddings'],
+                                              page_size=page_size):
+                page_embeddings = np.asarray(page['embeddings'], dtype=np.float32)
+                if embeddings_out is None:
+                    dimension = page_embeddings.shape[1]
+                    # 以記憶體映射方式預先配置完整矩陣，逐頁寫入
+                    embeddings_out = np.lib.format.open_memmap(
+                        embeddings_path, mode="w+", dtype=np.float32, shape=(total, dimension)
+                    )
+
+                # 集合在匯出期間增長時，只保留一開始統計的筆數
+                page_len = min(len(page['ids']), total - written)
+                if page_len <= 0:
+                    break
+                embeddings_out[written:written + page_len] = page_embeddings[:page_len]
+
+                for doc_id, document, metadata in islice(
+                        zip(page['ids'], page['documents'], page['metadatas']), page_len):
+                    record = {"id": doc_id, "document": document, "metadata": metadata}
+                    chunks_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+                written += page_len
+                typer.echo(f"  已匯出 {written}/{total} 個區塊")
+
+        if embeddings_out is not None:
+            embeddings_out.flush()
+            del embeddings_out
+            # 集合在匯出期間被刪除資料時，將向量矩陣截斷為實際寫入的筆數
+            if written < total:
+                self._truncate_embeddings(embeddings_path, written, page_size)
+        else:
+            np.save(embeddings_path, np.zeros((0, 0), dtype=np.float32))
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "collection_name": self.collection_name,
+            "collection_metadata": collection.metadata,
+            "embedding_model": embedding_model,
+            "count": written,
+            "dimension": dimension,
+            "dtype": "float32"
+        }
+        with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        return manifest
+
+    def _truncate_embeddings(self, embeddings_path: str, rows: int, page_size: int = 1000):
+        """
+        分段複製向量矩陣的前 rows 列並取代原檔案
+        """
+        source = np.load(embeddings_path, mmap_mode="r")
+        tmp_path = embeddings_path + ".tmp.npy"
+        target = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=source.dtype, shape=(rows, source.shape[1])
+        )
+        for start in range(0, rows, page_size):
+            target[start:start + page_size] = source[start:start + page_size]
+        target.flush()
+        del target
+        del source
+        os.replace(tmp_path, embeddings_path)
+
+    def validate_snapshot(self, input_dir: str) -> Dict[str, Any]:
+        """
+        在修改任何集合之前檢查快照是否完整
+
+        Args:
+            input_dir: 快照目錄
+
+        Returns:
+            快照的 manifest
+        """
+        manifest_path = os.path.join(input_dir, MANIFEST_FILE)
+        embeddings_path = os.path.join(input_dir, EMBEDDINGS_FILE)
+        chunks_path = os.path.join(input_dir, CHUNKS_FILE)
+        for path in [manifest_path, embeddings_path, chunks_path]:
+            if not os.path.exists(path):
+                raise ValueError(f"快照缺少檔案: {path}")
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict):
+            raise ValueError("manifest 格式錯誤")
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"不支援的快照格式版本: {manifest.get('format_version')}")
+        for key in ["count", "dimension"]:
+            if not isinstance(manifest.get(key), int):
+                raise ValueError(f"manifest 缺少或無效的欄位: {key}")
+
+        total = manifest["count"]
+        embeddings = np.load(embeddings_path, mmap_mode="r")
+        if total and embeddings.shape != (total, manifest["dimension"]):
+            raise ValueError(f"向量形狀 {embeddings.shape} 與 manifest 記錄的 "
+                             f"({total}, {manifest['dimension']}) 不符")
+
+        with open(chunks_path, "r", encoding="utf-8") as chunks_file:
+            chunk_count = sum(1 for _ in chunks_file)
+        if chunk_count != total:
+            raise ValueError(f"區塊筆數 ({chunk_count}) 與 manifest 記錄的 {total} 不符")
+
+        return manifest
+
+    def import_snapshot(self, input_dir: str, batch_size: int = 1000,
+                        indexed_hashes_file: str = "./indexed_hashes.txt",
+                        replace: bool = False) -> Dict[str, Any]:
+        """
+        將快照批量載入到新的集合，並重建已索引雜湊檔案
+
+        快照先載入到暫存集合，成功後才替換目標集合；載入失敗時
+        原有的集合與雜湊檔案保持不變。
+
+        Args:
+            input_dir: 快照目錄
+            batch_size: 每次寫入 ChromaDB 的筆數
+            indexed_hashes_file: 要重建的雜湊檔案路徑
+            replace: 目標集合已有資料時是否先刪除
+
+        Returns:
+            快照的 manifest
+        """
+        manifest = self.validate_snapshot(input_dir)
+
+        existing = [c.name if hasattr(c, "name") else c for c in self.client.list_collections()]
+        target_exists = self.collection_name in existing
+        if target_exists and not replace:
+            if self.client.get_collection(name=self.collection_name).count() > 0:
+                raise ValueError(f"集合 {self.collection_name} 已有資料，請使用 --replace 覆蓋")
+
+        staging_name = f"{self.collection_name}__import"
+        if staging_name in existing:
+            self.client.delete_collection(name=staging_name)
+        staging = self.client.create_collection(
+            name=staging_name,
+            metadata=manifest.get("collection_metadata") or None
+        )
+
+        total = manifest["count"]
+        content_hashes = []
+        seen_hashes = set()
+        loaded = 0
+        try:
+            embeddings = np.load(os.path.join(input_dir, EMBEDDINGS_FILE), mmap_mode="r")
+            with open(os.path.join(input_dir, CHUNKS_FILE), "r", encoding="utf-8") as chunks_file:
+                while loaded < total:
+                    records = [json.loads(line) for line in islice(chunks_file, min(batch_size, total - loaded))]
+                    if not records:
+                        break
+
+                    staging.add(
+                        ids=[r["id"] for r in records],
+                        documents=[r["document"] for r in records],
+                        metadatas=[r["metadata"] for r in records],
+                        embeddings=np.array(embeddings[loaded:loaded + len(records)])
+                    )
+
+                    for record in records:
+                        hash_val = (record["metadata"] or {}).get("content_hash")
+                        if hash_val and hash_val not in seen_hashes:
+                            seen_hashes.add(hash_val)
+                            content_hashes.append(hash_val)
+
+                    loaded += len(records)
+                    typer.echo(f"  已匯入 {loaded}/{total} 個區塊")
+
+            if loaded != total:
+                raise ValueError(f"區塊筆數 ({loaded}) 與 manifest 記錄的 {total} 不符")
+        except Exception:
+            self.client.delete_collection(name=staging_name)
+            raise
+
+        # 替換前先清空雜湊檔案，避免替換中途失敗時留下與集合不符的雜湊
+        write_indexed_hashes([], indexed_hashes_file)
+        if target_exists:
+            self.client.delete_collection(name=self.collection_name)
+        staging.modify(name=self.collection_name)
+        write_indexed_hashes(content_hashes, indexed_hashes_file)
+        return manifest
+
+@app.command("export")
+def export_command(output_dir: str,
+                   db_path: str = "./chroma_db",
+                   collection_name: str = "knowledge_base",
+                   page_size: int = 1000):
+    """
+    匯出知識庫快照
+    """
+    typer.echo(f"匯出集合 {collection_name} 到: {output_dir}")
+    manager = SnapshotManager(db_path=db_path, collection_name=collection_name)
+    manifest = manager.export_snapshot(output_dir, page_size=page_size)
+    typer.echo(f"匯出完成: {manifest['count']} 個區塊，向量維度 {manifest['dimension']}")
+
+@app.command("import")
+def import_command(input_dir: str,
+                   db_path: str = "./chroma_db",
+                   collection_name: str = "knowledge_base",
+                   indexed_hashes_file: str = "./indexed_hashes.txt",
+                   batch_size: int = 1000,
+                   replace: bool = False):
+    """
+    從快照匯入知識庫（不需重新向量化）
+    """
+    typer.echo(f"從 {input_dir} 匯入到集合 {collection_name}")
+    manager = SnapshotManager(db_path=db_path, collection_name=collection_name)
+    try:
+        manifest = manager.import_snapshot(input_dir, batch_size=batch_size,
+                                           indexed_hashes_file=indexed_hashes_file,
+                                           replace=replace)
+    except ValueError as e:
+        typer.echo(f"匯入失敗: {e}")
+        raise typer.Exit(code=1)
+    typer.echo(f"匯入完成: {manifest['count']} 個區塊，已重建 {indexed_hashes_file}")
+
+if __name__ == "__main__":
+    app()
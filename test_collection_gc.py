@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+測試集合垃圾回收功能
+"""
+
+import typer
+from collection_gc import CollectionGarbageCollector
+import chromadb
+import os
+import tempfile
+
+app = typer.Typer()
+
+def _create_test_collection(tmp_dir: str):
+    """
+    建立測試集合：一個來源文件存在的區塊、一個來源文件已刪除的區塊、
+    一個與第一個區塊內容雜湊相同的區塊
+    """
+    db_path = os.path.join(tmp_dir, "db")
+    kept_file = os.path.join(tmp_dir, "kept.txt")
+    deleted_file = os.path.join(tmp_dir, "deleted.txt")
+    copy_file = os.path.join(tmp_dir, "copy.txt")
+    for path in [kept_file, deleted_file, copy_file]:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("測試內容")
+    os.remove(deleted_file)
+
+    collection = chromadb.PersistentClient(path=db_path).get_or_create_collection(name="test_collection")
+    collection.add(
+        documents=["保留的區塊", "來源已刪除的區塊", "重複的區塊"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]],
+        metadatas=[
+            {"file_path": kept_file, "content_hash": "hash_kept"},
+            {"file_path": deleted_file, "content_hash": "hash_deleted"},
+            {"file_path": copy_file, "content_hash": "hash_kept"}
+        ],
+        ids=["kept-0", "deleted-0", "copy-0"]
+    )
+
+    hashes_file = os.path.join(tmp_dir, "indexed_hashes.txt")
+    with open(hashes_file, "w") as f:
+        f.write("hash_kept\nhash_deleted\nhash_orphan\n")
+
+    return db_path, hashes_file
+
+def _read_hashes(hashes_file: str):
+    with open(hashes_file, "r") as f:
+        return [line.strip() for line in f]
+
+def _remaining_ids(db_path: str):
+    collection = chromadb.PersistentClient(path=db_path).get_collection(name="test_collection")
+    return sorted(collection.get(include=[])['ids'])
+
+@app.command()
+def test_collection_gc():
+    """測試刪除來源文件不存在的區塊並重寫雜湊檔案"""
+    typer.echo("測試集合垃圾回收功能")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path, hashes_file = _create_test_collection(tmp_dir)
+        collector = CollectionGarbageCollector(db_path=db_path, collection_name="test_collection")
+
+        # 試運行不做任何修改
+        report = collector.collect(indexed_hashes_file=hashes_file, dry_run=True)
+        assert report["missing_file_chunks"] == 1
+        assert report["deleted_chunks"] == 0
+        assert _remaining_ids(db_path) == ["copy-0", "deleted-0", "kept-0"]
+        assert _read_hashes(hashes_file) == ["hash_kept", "hash_deleted", "hash_orphan"]
+
+        # 預設只刪除來源文件不存在的區塊，重複雜湊的區塊保留
+        report = collector.collect(indexed_hashes_file=hashes_file, page_size=1)
+        assert report["deleted_chunks"] == 1
+        assert report["duplicate_chunks"] == 0
+        assert _remaining_ids(db_path) == ["copy-0", "kept-0"]
+        assert _read_hashes(hashes_file) == ["hash_kept"]
+
+        # 指定 dedupe 時才刪除重複雜湊的區塊
+        report = collector.collect(indexed_hashes_file=hashes_file, dedupe=True)
+        assert report["deleted_chunks"] == 1
+        assert len(_remaining_ids(db_path)) == 1
+        assert _read_hashes(hashes_file) == ["hash_kept"]
+        typer.echo("垃圾回收結果正確")
+
+@app.command()
+def test_collection_gc_guard():
+    """測試大部分來源文件缺失時拒絕刪除"""
+    typer.echo("測試垃圾回收的安全檢查")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path, hashes_file = _create_test_collection(tmp_dir)
+        for file_name in ["kept.txt", "copy.txt"]:
+            os.remove(os.path.join(tmp_dir, file_name))
+        collector = CollectionGarbageCollector(db_path=db_path, collection_name="test_collection")
+
+        try:
+            collector.collect(indexed_hashes_file=hashes_file)
+            assert False, "來源文件全部缺失時應拒絕刪除"
+        except ValueError as e:
+            typer.echo(f"拒絕刪除: {e}")
+        assert len(_remaining_ids(db_path)) == 3
+        assert _read_hashes(hashes_file) == ["hash_kept", "hash_deleted", "hash_orphan"]
+
+        report = collector.collect(indexed_hashes_file=hashes_file, force=True)
+        assert report["deleted_chunks"] == 3
+        assert _remaining_ids(db_path) == []
+
+        # 不存在的集合不應被自動建立
+        missing_raised = False
+        try:
+            CollectionGarbageCollector(db_path=db_path, collection_name="missing_collection")
+        except Exception as e:
+            missing_raised = True
+            typer.echo(f"找不到集合: {e}")
+        assert missing_raised, "集合不存在時應拋出錯誤"
+        client = chromadb.PersistentClient(path=db_path)
+        assert "missing_collection" not in [c.name for c in client.list_collections()]
+        typer.echo("安全檢查正確")
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+測試批次多查詢搜尋的查詢擴展、分數融合與 MMR
+"""
+
+import typer
+import chromadb
+import numpy as np
+import tempfile
+from flexible_preprocessing import FlexiblePreprocessor
+from multi_query_search import MultiQuerySearch, expand_query, fuse_scores, mmr_select
+
+app = typer.Typer()
+
+@app.command()
+def test_expand_query():
+    """測試硬體型號與中英同義詞的查詢擴展"""
+    typer.echo("測試查詢擴展")
+    preprocessor = FlexiblePreprocessor()
+
+    queries = expand_query("MPU-9250 推薦", preprocessor)
+    assert queries[0] == "MPU-9250 推薦"
+    assert "MPU9250 推薦" in queries
+    assert "MPU-9250 recommend" in queries
+
+    queries = expand_query("ICM20948 gyroscope", preprocessor)
+    assert "ICM-20948 gyroscope" in queries
+    assert "ICM20948 陀螺儀" in queries
+
+    # 英文詞彙需完整比對單字
+    queries = expand_query("recommended warnings", preprocessor)
+    assert queries == ["recommended warnings"]
+
+    # 一般詞彙不應被當成硬體型號
+    for query in ["i2c", "python3", "esp32", "stm32f4 uart2 spi1"]:
+        assert expand_query(query, preprocessor) == [query]
+    queries = expand_query("esp32 i2c mpu9250 gyroscope 推薦", preprocessor)
+    assert queries == ["esp32 i2c mpu9250 gyroscope 推薦",
+                       "esp32 i2c mpu9250 陀螺儀 推薦",
+                       "esp32 i2c mpu9250 gyroscope recommend"]
+
+    # 型號改寫只替換完整的型號
+    queries = expand_query("MPU-9250 vs MPU-92500", preprocessor)
+    assert "MPU9250 vs MPU-92500" in queries
+    assert "MPU-9250 vs MPU92500" in queries
+    assert "MPU9250 vs MPU92500" not in queries
+
+    # 變體數量受 max_expansions 限制，型號變體不會佔滿所有名額
+    queries = expand_query("MPU-9250 GY-91 ICM20948 gyroscope 推薦", preprocessor, max_expansions=2)
+    assert len(queries) == 3
+    assert queries[0] == "MPU-9250 GY-91 ICM20948 gyroscope 推薦"
+    assert queries[1] in ["MPU9250 GY-91 ICM20948 gyroscope 推薦",
+                          "MPU-9250 GY-91 ICM-20948 gyroscope 推薦"]
+    assert queries[2] == "MPU-9250 GY-91 ICM20948 陀螺儀 推薦"
+
+    queries = expand_query("MPU-9250 GY-91 ICM20948", preprocessor, max_model_variants=2)
+    assert len(queries) == 3
+    typer.echo(f"查詢變體: {queries}")
+
+@app.command()
+def test_fuse_scores():
+    """測試加權 RRF 的分數與命中次數"""
+    typer.echo("測試分數融合")
+    ids = [["a", "b", "c"], ["b", "d"]]
+    weights = np.array([1.0, 0.5])
+
+    unique_ids, first_index, scores, hits = fuse_scores(ids, weights, rrf_k=60)
+    result = dict(zip(unique_ids.tolist(), zip(scores.tolist(), hits.tolist())))
+
+    assert np.isclose(result["a"][0], 1.0 / 61)
+    assert np.isclose(result["b"][0], 1.0 / 62 + 0.5 / 61)
+    assert np.isclose(result["c"][0], 1.0 / 63)
+    assert np.isclose(result["d"][0], 0.5 / 62)
+    assert result["b"][1] == 2
+    assert result["a"][1] == 1 and result["d"][1] == 1
+
+    # first_index 指向扁平結果中第一次出現的位置
+    flat_ids = [doc_id for row in ids for doc_id in row]
+    assert [flat_ids[i] for i in first_index] == unique_ids.tolist()
+    typer.echo(f"融合分數: {result}")
+
+@app.command()
+def test_mmr_select():
+    """測試 MMR 排除近似重複的結果"""
+    typer.echo("測試 MMR 去重")
+    embeddings = np.array([
+        [1.0, 0.0, 0.0],
+        [0.99, 0.01, 0.0],   # 與第一個幾乎相同
+        [0.0, 1.0, 0.0],
+        [0.0, 0.0, 1.0]
+    ])
+    relevance = np.array([1.0, 0.9, 0.5, 0.1])
+
+    selected = mmr_select(embeddings, relevance, top_k=4, duplicate_threshold=0.95)
+    assert selected[0] == 0
+    assert 1 not in selected
+    assert sorted(selected) == [0, 2, 3]
+
+    # 門檻提高後不視為重複
+    selected = mmr_select(embeddings, relevance, top_k=4, duplicate_threshold=1.01)
+    assert sorted(selected) == [0, 1, 2, 3]
+    typer.echo(f"選出的結果: {selected}")
+
+@app.command()
+def test_missing_collection():
+    """測試集合不存在時不會自動建立空集合"""
+    typer.echo("測試集合不存在的情況")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        missing_raised = False
+        try:
+            MultiQuerySearch(db_path=tmp_dir, collection_name="missing_collection")
+        except Exception as e:
+            missing_raised = True
+            typer.echo(f"找不到集合: {e}")
+        assert missing_raised, "集合不存在時應拋出錯誤"
+        client = chromadb.PersistentClient(path=tmp_dir)
+        assert "missing_collection" not in [c.name for c in client.list_collections()]
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+測試知識庫快照匯出/匯入功能
+"""
+
+import typer
+import snapshot_manager
+from snapshot_manager import SnapshotManager, CHUNKS_FILE, MANIFEST_FILE
+import chromadb
+import hashlib
+import json
+import os
+import tempfile
+
+app = typer.Typer()
+
+def _create_source_collection(db_path: str, contents):
+    """建立含有測試區塊的來源集合"""
+    client = chromadb.PersistentClient(path=db_path)
+    collection = client.get_or_create_collection(name="test_collection")
+    content_hashes = [hashlib.sha256(c.encode('utf-8')).hexdigest() for c in contents]
+    collection.add(
+        documents=contents,
+        embeddings=[[float(i), 1.0, 0.5] for i in range(len(contents))],
+        metadatas=[{"file_path": "./test.txt", "chunk_index": i, "content_hash": h}
+                   for i, h in enumerate(content_hashes)],
+        ids=[f"./test.txt-{i}" for i in range(len(contents))]
+    )
+    return content_hashes
+
+@app.command()
+def test_snapshot_roundtrip():
+    """測試快照匯出後匯入的一致性"""
+    typer.echo("測試快照匯出/匯入功能")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_db = os.path.join(tmp_dir, "source_db")
+        target_db = os.path.join(tmp_dir, "target_db")
+        snapshot_dir = os.path.join(tmp_dir, "snapshot")
+        hashes_file = os.path.join(tmp_dir, "indexed_hashes.txt")
+
+        contents = [f"這是第 {i} 個測試區塊，用於測試快照功能。" for i in range(5)]
+        content_hashes = _create_source_collection(source_db, contents)
+
+        # 分頁匯出（頁大小小於筆數）
+        manifest = SnapshotManager(source_db, "test_collection").export_snapshot(snapshot_dir, page_size=2)
+        assert manifest["count"] == 5
+        assert manifest["dimension"] == 3
+
+        # 匯入到新的資料庫
+        SnapshotManager(target_db, "test_collection").import_snapshot(
+            snapshot_dir, batch_size=2, indexed_hashes_file=hashes_file
+        )
+
+        imported = chromadb.PersistentClient(path=target_db).get_collection(name="test_collection")
+        results = imported.get(ids=["./test.txt-3"], include=['documents', 'metadatas', 'embeddings'])
+        assert imported.count() == 5
+        assert results['documents'][0] == contents[3]
+        assert results['metadatas'][0]["content_hash"] == content_hashes[3]
+        assert list(results['embeddings'][0]) == [3.0, 1.0, 0.5]
+
+        with open(hashes_file, "r") as f:
+            assert [line.strip() for line in f] == content_hashes
+        typer.echo("快照匯出/匯入一致")
+
+@app.command()
+def test_snapshot_import_safety():
+    """測試匯入不會在未確認或快照損毀時破壞既有集合"""
+    typer.echo("測試快照匯入的安全檢查")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_db = os.path.join(tmp_dir, "source_db")
+        target_db = os.path.join(tmp_dir, "target_db")
+        snapshot_dir = os.path.join(tmp_dir, "snapshot")
+        hashes_file = os.path.join(tmp_dir, "indexed_hashes.txt")
+
+        _create_source_collection(source_db, [f"快照區塊 {i}" for i in range(4)])
+        SnapshotManager(source_db, "test_collection").export_snapshot(snapshot_dir)
+
+        # 目標集合已有資料
+        existing_hashes = _create_source_collection(target_db, ["既有區塊"])
+        with open(hashes_file, "w") as f:
+            f.write(existing_hashes[0] + "\n")
+
+        # 未指定 replace 時拒絕匯入
+        try:
+            SnapshotManager(target_db, "test_collection").import_snapshot(
+                snapshot_dir, indexed_hashes_file=hashes_file
+            )
+            assert False, "集合已有資料時應拒絕匯入"
+        except ValueError as e:
+            typer.echo(f"拒絕匯入: {e}")
+
+        # 截斷 chunks.jsonl 後即使指定 replace 也不應修改既有集合
+        chunks_path = os.path.join(snapshot_dir, CHUNKS_FILE)
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        with open(chunks_path, "w", encoding="utf-8") as f:
+            f.writelines(lines[:-1])
+        try:
+            SnapshotManager(target_db, "test_collection").import_snapshot(
+                snapshot_dir, indexed_hashes_file=hashes_file, replace=True
+            )
+            assert False, "快照不完整時應拒絕匯入"
+        except ValueError as e:
+            typer.echo(f"拒絕匯入: {e}")
+
+        # manifest 缺少必要欄位時以 ValueError 回報
+        manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        del manifest["dimension"]
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        try:
+            SnapshotManager(target_db, "test_collection").validate_snapshot(snapshot_dir)
+            assert False, "manifest 缺少欄位時應拒絕匯入"
+        except ValueError as e:
+            typer.echo(f"拒絕匯入: {e}")
+
+        client = chromadb.PersistentClient(path=target_db)
+        assert client.get_collection(name="test_collection").count() == 1
+        assert "test_collection__import" not in [c.name for c in client.list_collections()]
+        with open(hashes_file, "r") as f:
+            assert [line.strip() for line in f] == existing_hashes
+        typer.echo("既有集合與雜湊檔案保持不變")
+
+@app.command()
+def test_snapshot_export_with_concurrent_delete():
+    """測試匯出期間集合被刪除資料時仍產生可匯入的快照"""
+    typer.echo("測試匯出期間刪除資料")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_db = os.path.join(tmp_dir, "source_db")
+        target_db = os.path.join(tmp_dir, "target_db")
+        snapshot_dir = os.path.join(tmp_dir, "snapshot")
+
+        _create_source_collection(source_db, [f"區塊 {i}" for i in range(6)])
+        source = chromadb.PersistentClient(path=source_db).get_collection(name="test_collection")
+
+        # 讀取第一頁後刪除尚未匯出的資料，模擬同時執行的 gc
+        original_iter = snapshot_manager.iter_collection_pages
+
+        def iter_with_delete(collection, include, page_size=1000):
+            for index, page in enumerate(original_iter(collection, include, page_size)):
+                yield page
+                if index == 0:
+                    source.delete(ids=["./test.txt-4", "./test.txt-5"])
+
+        snapshot_manager.iter_collection_pages = iter_with_delete
+        try:
+            manifest = SnapshotManager(source_db, "test_collection").export_snapshot(snapshot_dir, page_size=2)
+        finally:
+            snapshot_manager.iter_collection_pages = original_iter
+
+        assert manifest["count"] == 4
+        SnapshotManager(target_db, "test_collection").import_snapshot(
+            snapshot_dir, indexed_hashes_file=os.path.join(tmp_dir, "indexed_hashes.txt")
+        )
+        imported = chromadb.PersistentClient(path=target_db).get_collection(name="test_collection")
+        assert imported.count() == 4
+        typer.echo("截斷後的快照可正常匯入")
+
+if __name__ == "__main__":
+    app()